@@ -4,17 +4,29 @@ __license__ = "MPL 2.0"
 
 import os
 import re
+import shutil
+import time
 
 from jinja2 import Template
 
 from caliper.logger import logger
 from caliper.managers import PypiManager
 from caliper.utils.command import CommandRunner
-from caliper.utils.file import read_file, read_yaml
+from caliper.utils.file import (
+    mkdir_p,
+    read_file,
+    read_json,
+    read_yaml,
+    write_file,
+    write_json,
+)
 
 from .tasks import analysis_task
 from .workers import Workers
 
+# Package managers supported by the analyzer
+_PYPI_RE = re.compile("pypi", re.IGNORECASE)
+
 
 class CaliperAnalyzerBase:
     """A Caliper Analyzer takes a caliper.yaml, reads it in, and then builds
@@ -61,6 +73,13 @@ class CaliperAnalyzerBase:
         if not os.path.exists(self.dockerfile):
             logger.exit("The Dockerfile does not exist.")
 
+        # An optional base Dockerfile is built once per Python version
+        self.base_dockerfile = self.config.get("base_dockerfile")
+        if self.base_dockerfile:
+            self.base_dockerfile = os.path.join(self.config_dir, self.base_dockerfile)
+            if not os.path.exists(self.base_dockerfile):
+                logger.exit("The base Dockerfile does not exist.")
+
         # Set the dependency name and any additional args
         self.dependency = self.config.get("dependency")
         self.args = self.config.get("args", {})
@@ -68,6 +87,11 @@ class CaliperAnalyzerBase:
         # Filter to specific python and library versions
         self.python_versions = self.config.get("python_versions", [])
         self.test_versions = self.config.get("versions", [])
+
+        # Images to pull and use as a layer cache for container builds
+        self.cache_from = self.config.get("cache_from") or []
+        if not isinstance(self.cache_from, list):
+            logger.exit("cache_from must be a list of images.")
         for dirname in [self.outdir, self.data_dir]:
             if not os.path.exists(dirname):
                 os.makedirs(dirname)
@@ -79,7 +103,7 @@ class CaliperAnalyzer(CaliperAnalyzerBase):
         class depending on the packagemanger field. Currently we only support
         pypi
         """
-        if re.search("pypi", self.config["packagemanager"], re.IGNORECASE):
+        if _PYPI_RE.search(self.config["packagemanager"]):
             return CaliperPypiAnalyzer(self.config_file)
         logger.exit(
             "%s is not a supported package manager at this time."
@@ -101,8 +125,16 @@ class CaliperPypiAnalyzer(CaliperAnalyzerBase):
         func=None,
         force=False,
         cleanup=False,
+        refresh_metadata=False,
+        capture_requirements=True,
     ):
         """Once the config is loaded, run the analysis."""
+        # Pruning after each build would remove the shared base images
+        if self.base_dockerfile and cleanup:
+            logger.exit(
+                "base_dockerfile cannot be used with cleanup, as pruning removes the base images."
+            )
+
         # The release filter is a regular expression we use to find the correct
         # platform / architecture. We select linux wheels and source
         release_filter = release_filter or "(.*manylinux.*x86_64.*|[.]tar[.]gz)"
@@ -114,17 +146,32 @@ class CaliperPypiAnalyzer(CaliperAnalyzerBase):
         if runner.retval != 0:
             logger.exit("Docker must be installed to build containers.")
 
+        # Cache images must be present locally to be used, a failed pull is ignored
+        for image in self.cache_from:
+            runner.run_command(["docker", "pull", image])
+
         # Prepare arguments for runner, whether it's serial or parallel
-        manager = PypiManager(self.dependency)
-        all_releases = manager.filter_releases(release_filter)
-        python_versions = manager.get_python_versions()
-        python_version_regex = "(%s)" % "|".join(self.python_versions)
+        all_releases, python_versions = self._load_releases(
+            release_filter, refresh=refresh_metadata
+        )
+        wanted_python_versions = {str(v).lower() for v in self.python_versions}
 
         # Read in the template, populate with each deps version
         template = Template(read_file(self.dockerfile, readlines=False))
 
+        # A shared base image per Python version is built on first use
+        base_template = None
+        if self.base_dockerfile:
+            base_template = Template(read_file(self.base_dockerfile, readlines=False))
+        bases = {}
+
+        # Rendered Dockerfiles are written once, and tasks are given the path
+        rendered_dir = os.path.join(self.outdir, ".rendered")
+        mkdir_p(rendered_dir)
+
         # Prepare arguments to build and test a container for each
         tasks = {}
+        tests = self.config.get("tests") or []
 
         # Loop over versions of the library, and Python versions
         for version, releases in all_releases.items():
@@ -137,8 +184,9 @@ class CaliperPypiAnalyzer(CaliperAnalyzerBase):
 
             for python_version in python_versions:
                 # If the user has requested a subset of Python versions
-                if self.python_versions and not re.search(
-                    python_version_regex, python_version, re.IGNORECASE
+                if (
+                    wanted_python_versions
+                    and python_version.lower() not in wanted_python_versions
                 ):
                     continue
 
@@ -149,38 +197,116 @@ class CaliperPypiAnalyzer(CaliperAnalyzerBase):
                     python_version,
                 )
                 outfile = os.path.join(self.data_dir, "%s.json" % name)
-                spec = lookup.get(python_version, {})
-                tests = "\n".join(self.config.get("tests"))
+
+                # The task would skip an existing result anyway, don't prepare it
+                if os.path.exists(outfile) and not force:
+                    continue
 
                 # If the Python version is not in the lookup we cannot do a build
                 exists = python_version in lookup
 
                 # It's easier to pass the rendered template than all arguments for it
-                container_base = "python:%s" % ".".join(
-                    [x for x in python_version.lstrip("cp")]
-                )
-                result = template.render(
-                    base=container_base,
-                    filename=spec.get("url", ""),
-                    basename=spec.get("filename", ""),
-                    **self.args
-                )
+                dockerfile = None
+                if exists:
+                    spec = lookup[python_version]
+                    container_base = "python:%s" % ".".join(
+                        [x for x in python_version.lstrip("cp")]
+                    )
+                    if base_template:
+                        if python_version not in bases:
+                            bases[python_version] = self._build_base(
+                                base_template, container_base, python_version
+                            )
+                        container_base = bases[python_version]
+                    dockerfile = os.path.join(rendered_dir, "%s.Dockerfile" % name)
+                    write_file(
+                        dockerfile,
+                        template.render(
+                            base=container_base,
+                            filename=spec.get("url", ""),
+                            basename=spec.get("filename", ""),
+                            **self.args
+                        ),
+                    )
                 params = {
                     "dependency": self.dependency,
                     "outfile": outfile,
-                    "dockerfile": result,
+                    "dockerfile_path": dockerfile,
                     "force": force,
                     "exists": exists,
                     "name": name,
                     "tests": tests,
                     "cleanup": cleanup,
                     "outdir": self.config_dir,
+                    "cache_from": self.cache_from,
+                    "capture_requirements": capture_requirements,
                 }
                 tasks[name] = (func, params)
 
-        if parallel:
-            return self._run_parallel(tasks, nproc, show_progress)
-        return self._run_serial(tasks)
+        # Tasks remove their rendered Dockerfile, the folder is removed after
+        try:
+            if parallel:
+                return self._run_parallel(tasks, nproc, show_progress)
+            return self._run_serial(tasks)
+        finally:
+            shutil.rmtree(rendered_dir, ignore_errors=True)
+
+    def _load_releases(self, release_filter, refresh=False, ttl=6 * 60 * 60):
+        """Return filtered releases and Python versions for the dependency.
+        Results are cached under .caliper/.pypi-cache for ttl seconds so that
+        re-running an analysis doesn't need to query pypi again.
+        """
+        cache_dir = os.path.join(self.outdir, ".pypi-cache")
+        cache_file = os.path.join(cache_dir, "%s.json" % self.dependency)
+
+        # Use the cache if it's recent and was derived with the same filter
+        if (
+            not refresh
+            and os.path.exists(cache_file)
+            and time.time() - os.path.getmtime(cache_file) < ttl
+        ):
+            cached = read_json(cache_file)
+            if cached.get("release_filter") == release_filter:
+                logger.debug("Using cached releases from %s" % cache_file)
+                return cached["releases"], cached["python_versions"]
+
+        manager = PypiManager(self.dependency)
+        all_releases = manager.filter_releases(release_filter)
+        python_versions = sorted(manager.get_python_versions())
+
+        mkdir_p(cache_dir)
+        write_json(
+            {
+                "release_filter": release_filter,
+                "releases": all_releases,
+                "python_versions": python_versions,
+            },
+            cache_file,
+        )
+        return all_releases, python_versions
+
+    def _build_base(self, template, container_base, python_version):
+        """Build the shared base image for a Python version, and return the tag.
+        Tasks for the same Python version render their Dockerfile from it,
+        so layers common to the grid are only built once.
+        """
+        tag = ("caliper-base-%s:%s" % (self.dependency, python_version)).lower()
+        dockerfile = os.path.join(
+            self.outdir, "Dockerfile.caliper.base.%s" % python_version
+        )
+        write_file(dockerfile, template.render(base=container_base, **self.args))
+
+        logger.info("Building shared base image %s" % tag)
+        runner = CommandRunner()
+        runner.run_command(
+            ["docker", "build", "-f", dockerfile, "-t", tag, "."], cwd=self.config_dir
+        )
+        os.remove(dockerfile)
+        if runner.retval != 0:
+            logger.exit(
+                "Error building base image %s: %s" % (tag, "".join(runner.error))
+            )
+        return tag
 
     def _run_parallel(self, tasks, nproc, show_progress=True):
         """Run tasks in parallel"""
@@ -5,12 +5,28 @@ __license__ = "MPL 2.0"
 import multiprocessing
 import os
 import sys
-import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from caliper.logger import logger
 from caliper.utils.command import CommandRunner
-from caliper.utils.file import write_file, write_json
+from caliper.utils.file import read_file, write_json
+
+
+def run_test(container_name, script):
+    """Run a single test script in a container, and return the result. Each
+    test gets its own command runner so that tests can be run in threads.
+    """
+    runner = CommandRunner()
+    start = time.time()
+    runner.run_command(["docker", "run", "--rm", container_name, "python", script])
+    end = time.time()
+    return {
+        "error": runner.error,
+        "output": runner.output,
+        "retval": runner.retval,
+        "seconds": round(end - start, 2),
+    }
 
 
 def analysis_task(**kwargs):
@@ -24,13 +40,12 @@ def analysis_task(**kwargs):
         "outdir",
         "dependency",
         "outfile",
-        "dockerfile",
         "exists",
     ]:
         if key not in kwargs or kwargs.get(key) is None:
             logger.exit("%s is missing or undefined for analysis task." % key)
 
-    dockerfile = kwargs.get("dockerfile")
+    dockerfile = kwargs.get("dockerfile_path")
     outfile = kwargs.get("outfile")
     cleanup = kwargs.get("cleanup", False)
     dependency = kwargs.get("dependency")
@@ -38,9 +53,10 @@ def analysis_task(**kwargs):
     exists = kwargs.get("exists")
     name = kwargs.get("name")
     outdir = kwargs.get("outdir")
+    cache_from = kwargs.get("cache_from") or []
+    capture_requirements = kwargs.get("capture_requirements", True)
     result = {"inputs": kwargs}
-    tests = kwargs.get("tests")
-    tests = [] if not tests else tests.split("\n")
+    tests = kwargs.get("tests") or []
     worker_id = multiprocessing.current_process().name
 
     # If the output file already exists and force is true, overwrite
@@ -53,24 +69,32 @@ def analysis_task(**kwargs):
         write_json(result, outfile)
         return
 
-    # Build temporary Dockerfile
-    dockerfile_name = "Dockerfile.caliper.%s" % name
-    dockerfile_fullpath = os.path.join(tempfile.gettempdir(), dockerfile_name)
+    # A Dockerfile is only rendered for tasks that can be built
+    if not dockerfile or not os.path.exists(dockerfile):
+        logger.exit("dockerfile_path is missing or undefined for analysis task.")
 
-    # Write and build temporary Dockerfile, and build the container
-    write_file(dockerfile_fullpath, dockerfile)
+    # The rendered file is removed after the build, so keep it with the result
+    result["inputs"]["dockerfile"] = read_file(dockerfile, readlines=False)
+
+    # Build the container from the rendered Dockerfile
     container_name = "%s-container:%s" % (dependency, name)
     sys.stdout.write(
         "[%s] 0 of %s - building container %s\n"
         % (worker_id, len(tests), container_name)
     )
     runner = CommandRunner()
+
+    # Cache images are pulled once by the analyzer, before tasks are run
+    cache_args = []
+    for image in cache_from:
+        cache_args += ["--cache-from", image]
+
     runner.run_command(
-        [
-            "docker",
-            "build",
+        ["docker", "build"]
+        + cache_args
+        + [
             "-f",
-            dockerfile_fullpath,
+            dockerfile,
             "-t",
             container_name,
             ".",
@@ -79,8 +103,8 @@ def analysis_task(**kwargs):
     )
 
     # Clean up Dockerfile
-    if os.path.exists(dockerfile_fullpath):
-        os.remove(dockerfile_fullpath)
+    if os.path.exists(dockerfile):
+        os.remove(dockerfile)
 
     # Keep a result for each script
     result["tests"] = {"build": {"retval": runner.retval}}
@@ -89,27 +113,35 @@ def analysis_task(**kwargs):
         write_json(result, outfile)
         return
 
-    # Get packages installed for each container
-    runner.run_command(["docker", "run", container_name, "pip", "freeze"])
-    result["requirements.txt"] = runner.output
+    # Get packages installed for each container, unless install-only sweep
+    if tests or capture_requirements:
+        runner.run_command(["docker", "run", container_name, "pip", "freeze"])
+        result["requirements.txt"] = runner.output
 
     # Test basic import of library
     test_results = {}
 
-    # Run each test
-    for i, script in enumerate(tests):
-        start = time.time()
-        sys.stdout.write("[%s] %s of %s - %s" % (worker_id, i + 1, len(tests), script))
-        runner.run_command(["docker", "run", "--rm", container_name, "python", script])
-        end = time.time()
-        test_results[script] = {
-            "error": runner.error,
-            "output": runner.output,
-            "retval": runner.retval,
-            "seconds": round(end - start, 2),
-        }
-        sys.stdout.write(" total time: %s seconds \n" % test_results[script]["seconds"])
-        sys.stdout.flush()
+    # Run each test, scripts are independent so container runs can overlap
+    if tests:
+        with ThreadPoolExecutor(max_workers=min(4, len(tests))) as executor:
+            futures = {
+                executor.submit(run_test, container_name, script): script
+                for script in tests
+            }
+            for i, future in enumerate(as_completed(futures)):
+                script = futures[future]
+                test_results[script] = future.result()
+                sys.stdout.write(
+                    "[%s] %s of %s - %s total time: %s seconds \n"
+                    % (
+                        worker_id,
+                        i + 1,
+                        len(tests),
+                        script,
+                        test_results[script]["seconds"],
+                    )
+                )
+                sys.stdout.flush()
 
     # Update results with all tests
     result["tests"].update(test_results)
@@ -117,8 +149,6 @@ def analysis_task(**kwargs):
     # Save the result to file, clean up
     write_json(result, outfile)
     runner.run_command(["docker", "rmi", container_name, "--force"])
-    runner.run_command(["docker", "images", "-f", "dangling=true", "-q"])
-    for layer in runner.output:
-        runner.run_command(["docker", "rmi", layer.strip("\n"), "--force"])
+    runner.run_command(["docker", "image", "prune", "--force"])
     if cleanup:
         runner.run_command(["docker", "system", "prune", "--all", "--force"])
@@ -2,23 +2,42 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
-import itertools
 import multiprocessing
 import signal
 import sys
 import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from caliper.logger import logger
 
 
 class Workers:
-    def __init__(self, workers=None, show_progress=True):
-        # Set a conservative number of workers
-        self.workers = workers or int(multiprocessing.cpu_count() / 2) - 1
+    # Modules imported once by a forkserver, and inherited by each worker
+    preload = ["caliper.analysis.tasks"]
+
+    def __init__(
+        self, workers=None, show_progress=True, start_method=None, batch_size=None
+    ):
+        # Tasks mostly wait on docker build and run, so use all cpus (or more)
+        self.workers = workers or max(2, multiprocessing.cpu_count())
+
+        # fork lets workers run functions defined in __main__ and keeps the
+        # parent's logging setup. Windows only supports spawn, and a forkserver
+        # (with caliper preloaded) can be requested with start_method.
+        if not start_method:
+            start_method = "spawn" if sys.platform == "win32" else "fork"
+        self.start_method = start_method
+        self.context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            self.context.set_forkserver_preload(self.preload)
         logger.debug("Using %s workers for multiprocess." % self.workers)
         self.tasks = {}
         self.show_progress = show_progress
 
+        # Tasks are sent to workers in batches, sized by task count if unset
+        self.batch_size = batch_size
+
     def start(self):
         logger.debug("Starting analysis workers!")
         self.start_time = time.time()
@@ -35,6 +54,14 @@ class Workers:
         """
         self.tasks[key] = (func, params)
 
+    def batches(self):
+        """Split tasks into lists of (key, func, params) to send to a worker
+        at once, so that many small tasks don't each need a round trip.
+        """
+        items = [(key, func, params) for key, (func, params) in self.tasks.items()]
+        batch_size = self.batch_size or max(1, len(items) // (8 * self.workers))
+        return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+
     def run(self):
         """run will send a list of tasks, a tuple with arguments, through a function.
         The tasks should be added with add_task.
@@ -48,47 +75,46 @@ class Workers:
 
         # results will also have the same key to look up
         finished = dict()
-        results = []
 
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, total),
+            mp_context=self.context,
+            initializer=init_worker,
+        )
         try:
-            pool = multiprocessing.Pool(self.workers, init_worker)
-
             self.start()
             progress = 1
             logger.info("Preparing %s tasks..." % total)
-            for key, task in self.tasks.items():
-                func, params = task
-                if self.show_progress:
-                    prefix = "[%s/%s]" % (progress, total)
-                    logger.show_progress(progress, total, length=35, prefix=prefix)
-                result = pool.apply_async(multi_wrapper, multi_package(func, [params]))
-
-                # Store the key with the result
-                results.append((key, result))
-                progress += 1
-
-            progress = 1
-            logger.info("Waiting for results...")
-            while len(results) > 0:
-                pair = results.pop()
-                key, result = pair
-                if self.show_progress:
-                    prefix = "[%s/%s]" % (progress, total)
-                    logger.show_progress(progress, total, length=35, prefix=prefix)
-                result.wait()
-                progress += 1
-                finished[key] = result.get()
+            futures = [executor.submit(batch_runner, batch) for batch in self.batches()]
+
+            # Redraw the progress bar at most ~200 times, and for the last task
+            step = max(1, total // 200)
+            prefix = "[%%d/%d]" % total
+
+            # Results are recorded in the order that batches complete
+            for future in as_completed(futures):
+                for key, result in future.result():
+                    if self.show_progress and (
+                        progress % step == 0 or progress == total
+                    ):
+                        logger.show_progress(
+                            progress, total, length=35, prefix=prefix % progress
+                        )
+                    finished[key] = result
+                    progress += 1
 
             self.end()
-            pool.close()
-            pool.join()
+            executor.shutdown()
+            release_memory()
 
         except (KeyboardInterrupt, SystemExit):
             logger.error("Keyboard interrupt detected, terminating workers!")
-            pool.terminate()
+            terminate(executor)
             sys.exit(1)
 
         except Exception:
+            logger.error(traceback.format_exc())
+            terminate(executor)
             logger.exit("Error running task.")
 
         return finished
@@ -99,11 +125,42 @@ def init_worker():
     signal.signal(signal.SIGINT, signal.SIG_IGN)
 
 
-def multi_wrapper(func_args):
-    function, kwargs = func_args
-    return function(**kwargs)
-
-
-def multi_package(func, kwargs):
-    zipped = zip(itertools.repeat(func), kwargs)
-    return zipped
+def terminate(executor):
+    """Cancel pending tasks and stop running workers, so an error doesn't
+    wait for (or leave behind) tasks that are still running.
+    """
+    # shutdown doesn't stop a running task (e.g., a docker build)
+    if sys.version_info >= (3, 14):
+        executor.terminate_workers()
+        return
+
+    # There is no public way to stop workers before Python 3.14, so the
+    # executor's own processes are terminated. They must be found first,
+    # shutdown clears them.
+    processes = getattr(executor, "_processes", None)
+    if processes is None:
+        logger.warning("Cannot find worker processes, running tasks may continue.")
+        processes = {}
+    processes = list(processes.values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def release_memory():
+    """Ask glibc to return freed heap memory to the OS. Results from many tasks
+    can leave the parent with a large, fragmented heap after a run.
+    """
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        import ctypes
+
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def batch_runner(batch):
+    """Run a batch of tasks, returning a list of (key, result)"""
+    return [(key, func(**params)) for key, func, params in batch]
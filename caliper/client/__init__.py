@@ -9,10 +9,31 @@ import sys
 
 import caliper
 from caliper.logger import setup_logger
-from caliper.managers.base import ManagerBase
 
 
-def get_parser():
+def get_export_formats():
+    """Importing the managers is slow, so only do it for commands that need them"""
+    from caliper.managers.base import ManagerBase
+
+    return ManagerBase.export_formats
+
+
+def positive_int(value):
+    """An argparse type for an integer greater than zero"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("%s is not a positive integer" % value)
+    return number
+
+
+def get_parser(command=None):
+    """Build the caliper parser. If a command is provided, export formats are
+    only looked up if that command needs them. The default (None) builds all.
+    """
+    export_formats = []
+    if command is None or command in ["extract", "update"]:
+        export_formats = get_export_formats()
+
     parser = argparse.ArgumentParser(
         description="Caliper is a tool for measuring and assessing changes in packages."
     )
@@ -86,6 +107,22 @@ def get_parser():
         action="store_true",
     )
 
+    analyze.add_argument(
+        "--refresh-metadata",
+        dest="refresh_metadata",
+        help="Ignore cached package metadata and query the package manager again.",
+        default=False,
+        action="store_true",
+    )
+
+    analyze.add_argument(
+        "--no-requirements",
+        dest="no_requirements",
+        help="Do not run pip freeze in containers when no tests are defined.",
+        default=False,
+        action="store_true",
+    )
+
     analyze.add_argument(
         "--nprocs",
         dest="nprocs",
@@ -115,7 +152,7 @@ def get_parser():
         "--format",
         dest="fmt",
         help="the format to extract. Defaults to json (multiple files).",
-        choices=ManagerBase.export_formats + [None],
+        choices=export_formats + [None],
         default=None,
     )
 
@@ -134,6 +171,14 @@ def get_parser():
         action="store_true",
     )
 
+    extract.add_argument(
+        "--jobs",
+        dest="jobs",
+        help="number of versions to download in parallel (defaults to 8).",
+        default=8,
+        type=positive_int,
+    )
+
     update = subparsers.add_parser(
         "update",
         help="update an extraction for one or more software packages.",
@@ -151,7 +196,7 @@ def get_parser():
         "--format",
         dest="fmt",
         help="the format to update. Defaults to existing format in repository.",
-        choices=ManagerBase.export_formats + [None],
+        choices=export_formats + [None],
         default=None,
     )
 
@@ -236,14 +281,14 @@ def get_parser():
         help="Force threads rather than processes.",
     )
 
-    for command in [extract, view]:
-        command.add_argument(
+    for subparser in [extract, view]:
+        subparser.add_argument(
             "--outdir",
             help="output directory to write files.",
             default=None,
         )
 
-        command.add_argument(
+        subparser.add_argument(
             "--force",
             dest="force",
             help="if a file exists, do not overwrite.",
@@ -257,7 +302,9 @@ def get_parser():
 def main():
     """main entrypoint for rse"""
 
-    parser = get_parser()
+    # The command is the first positional argument (logging flags take no values)
+    command = next((x for x in sys.argv[1:] if not x.startswith("-")), "")
+    parser = get_parser(command)
 
     def help(return_code=0):
         """print help, including the software version and active client
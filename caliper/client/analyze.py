@@ -4,7 +4,6 @@ __license__ = "MPL 2.0"
 
 import os
 
-from caliper.analysis import CaliperAnalyzer
 from caliper.logger import logger
 
 
@@ -13,6 +12,9 @@ def main(args, extra):
     if not args.config or not os.path.exists(args.config):
         logger.exit("You must provide an existing caliper.yaml config with --config.")
 
+    # Deferred so a bad config exits before importing the analysis stack
+    from caliper.analysis import CaliperAnalyzer
+
     client = CaliperAnalyzer(args.config)
     analyzer = client.get_analyzer()
 
@@ -23,4 +25,6 @@ def main(args, extra):
         force=args.force,
         parallel=False,
         cleanup=args.cleanup,
+        refresh_metadata=args.refresh_metadata,
+        capture_requirements=not args.no_requirements,
     )
@@ -11,22 +11,23 @@ from caliper.metrics import MetricsExtractor
 
 def main(args, extra):
     # Ensure that all metrics are valid
-    client = MetricsExtractor(quiet=True)
+    client = MetricsExtractor(quiet=True, jobs=args.jobs)
     metrics = args.metric.split(",")
 
     # If asking for all, we will do all regardless of other specifications
     if "all" in metrics:
         metrics = ["all"]
 
-    for metric in metrics:
-        if metric == "all":
-            continue
-        if metric not in client.metrics:
-            logger.exit("%s is not a known metric." % metric)
+    unknown = set(metrics) - set(client.metrics) - {"all"}
+    if unknown:
+        logger.exit("%s is not a known metric." % ", ".join(sorted(unknown)))
 
     # prepare top level output directory
     outdir = args.outdir or os.getcwd()
 
+    # Honor the args.version
+    versions = args.versions.split(",") if args.versions else None
+
     # Now parse the package names and do the extraction!
     for package in args.packages:
         uri, package = package.split(":", 1)  # pypi:sif
@@ -35,11 +36,8 @@ def main(args, extra):
         except NotImplementedError:
             logger.exit("%s is not a valid package manager uri." % package)
 
-        # Create a client to interact with
-        client = MetricsExtractor(manager, quiet=True)
-
-        # Honor the args.version
-        versions = args.versions.split(",") if args.versions else None
+        # Reuse the client (and discovered metrics) with the new manager
+        client.set_manager(manager)
 
         # Do the extraction
         for metric in metrics:
@@ -3,14 +3,19 @@ __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 import re
+import sys
 
 from caliper.metrics import MetricsExtractor
 
 
 def main(args, extra):
     client = MetricsExtractor()
-    for name, metric in client.metrics.items():
-        if not args.query:
-            print("%20s: %s" % (name, metric))
-        elif args.query and re.search(args.query, name):
-            print("%20s: %s" % (name, metric))
+    query = re.compile(args.query) if args.query else None
+
+    # Write all matching metrics at once
+    lines = [
+        "%20s: %s\n" % (name, metric)
+        for name, metric in client.metrics.items()
+        if not query or query.search(name)
+    ]
+    sys.stdout.write("".join(lines))
@@ -5,8 +5,6 @@ __license__ = "MPL 2.0"
 import os
 
 from caliper.logger import logger
-from caliper.metrics import MetricsUpdater
-from caliper.utils.file import read_yaml
 
 
 def main(args, extra):
@@ -16,6 +14,10 @@ def main(args, extra):
             "You must provide an existing caliper.yaml config with --config, or --packages."
         )
 
+    # Deferred so a bad config exits before importing managers and metrics
+    from caliper.metrics import MetricsUpdater
+    from caliper.utils.file import read_yaml
+
     # Ensure that all metrics are valid
     client = MetricsUpdater(quiet=True)
     metrics = args.metric.split(",")
@@ -24,9 +26,9 @@ def main(args, extra):
     if "all" in metrics:
         metrics = list(client.metrics)
 
-    for metric in metrics:
-        if metric not in client.metrics:
-            logger.exit("%s is not a known metric." % metric)
+    unknown = set(metrics) - set(client.metrics)
+    if unknown:
+        logger.exit("%s is not a known metric." % ", ".join(sorted(unknown)))
 
     # prepare top level output directory
     outdir = args.outdir or os.getcwd()
@@ -4,7 +4,7 @@ __license__ = "MPL 2.0"
 
 import os
 from abc import abstractmethod
-from distutils.version import StrictVersion
+from urllib.parse import urlsplit
 
 from caliper.utils.command import wget_and_extract
 
@@ -28,13 +28,16 @@ class ManagerBase:
     def specs(self):
         """Retrieve specs and populate _specs if they don't exist"""
         if not self._specs:
-            return self.get_package_metadata()
+            self._specs = self.get_package_metadata() or []
         return self._specs
 
     @property
     def package_name(self):
         if self.uri:
-            return self.uri.replace("%s:" % self.name, "", 1)
+            prefix = "%s:" % self.name
+            if self.uri.startswith(prefix):
+                return self.uri[len(prefix) :]
+            return self.uri
 
     def __str__(self):
         return "[manager:%s]" % self.name
@@ -44,10 +47,11 @@ class ManagerBase:
 
     def sort_specs(self, specs, by="version"):
         """If the tags are out of order, we won't be able to derive"""
-        lookup = {x["version"].lstrip("v"): x for x in specs}
-        versions = [x[by].lstrip("v") for x in self._specs]
-        versions.sort(key=StrictVersion)
-        return [lookup[x] for x in versions]
+        from packaging.version import Version
+
+        keyed = [(Version(x[by].lstrip("v")), x) for x in specs]
+        keyed.sort(key=lambda pair: pair[0])
+        return [x for _, x in keyed]
 
     def download(self, spec, dest):
         """given a temporary directory and a spec, the default download
@@ -56,11 +60,14 @@ class ManagerBase:
         provide it's own download function for the particular spec to the
         download folder provided.
         """
-        download_to = os.path.join(dest, os.path.basename(spec["source"]["filename"]))
+        url = spec["source"]["filename"]
+
+        # The filename is the last part of the url path (without a query)
+        download_to = os.path.join(dest, urlsplit(url).path.rpartition("/")[2])
 
         # Extraction type is based on source type
         wget_and_extract(
-            url=spec["source"]["filename"],
+            url=url,
             download_type=spec["source"]["type"],
             download_to=download_to,
         )
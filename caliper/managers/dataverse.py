@@ -3,9 +3,11 @@ __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from caliper.logger import logger
 from caliper.managers.base import ManagerBase
+from caliper.utils.command import response_json
 
 
 class DataverseManager(ManagerBase):
@@ -52,7 +54,7 @@ class DataverseManager(ManagerBase):
                 % (name, response.status_code, response.reason)
             )
 
-        dataset = response.json()
+        dataset = response_json(response)
 
         # Since this corresponds only to the latest version, put into one entry
         files_list = dataset["data"]["latestVersion"]["files"]
@@ -77,9 +79,20 @@ class DataverseManager(ManagerBase):
         # Initialize a client
         self.init_client()
 
-        for fileObject in spec["source"]["files"]:
-            download_to = os.path.join(dest, fileObject["dataFile"]["filename"])
-            file_id = fileObject["dataFile"]["id"]
-            response = self.client.get_datafile(file_id)
-            with open(download_to, "wb") as f:
-                f.write(response.content)
+        # Files are independent, so download them in parallel
+        workers = int(os.environ.get("CALIPER_DATAVERSE_WORKERS", 8))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(
+                lambda fileObject: self._download_file(fileObject, dest),
+                spec["source"]["files"],
+            ):
+                pass
+
+    def _download_file(self, fileObject, dest):
+        """download a single dataverse file object to a destination folder"""
+        download_to = os.path.join(dest, fileObject["dataFile"]["filename"])
+        file_id = fileObject["dataFile"]["id"]
+        response = self.client.get_datafile(file_id)
+        with open(download_to, "wb") as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
@@ -4,11 +4,17 @@ __license__ = "MPL 2.0"
 
 import os
 
-from git import Repo
+from git import Reference, Repo
 
 from caliper.logger import logger
 from caliper.utils.command import run_command
 
+# pygit2 is optional, and stages files in process instead of running git add
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 
 class GitManager:
     """Interact with a Git repository. This mananger is not intended to extract
@@ -22,21 +28,41 @@ class GitManager:
         self.folder = folder or ""
         self.quiet = quiet
         self.repo = None
+        self._init_cmds = {}
         self._update_repo(self.folder)
 
     def _update_repo(self, dest):
         self.git_dir = os.path.join(dest, ".git")
         if os.path.exists(self.git_dir):
             self.repo = Repo(self.git_dir)
+            self._repo_dest = dest
+
+    def _has_repo(self, dest):
+        """Determine if we can use the loaded repository (in process) for dest"""
+        return self.repo is not None and dest == self._repo_dest
 
     def add(self, filename=".", dest=None):
-        """Add a file to the git repository"""
+        """Add a file to the git repository. With pygit2 installed and a loaded
+        repository, adding everything doesn't run git.
+        """
         dest = dest or self.folder or ""
+        if filename == "." and pygit2 is not None and self._has_repo(dest):
+            index = pygit2.Repository(dest).index
+            index.add_all()
+            index.write()
+            return []
         return self.run_command(self.init_cmd(dest) + ["add", filename])
 
     def commit(self, message, dest=None):
-        """commit to a particular directory"""
+        """commit to a particular directory. With a loaded repository, changes
+        to tracked files are staged (like commit -a) and committed without
+        running git commit.
+        """
         dest = dest or self.folder or ""
+        if self._has_repo(dest):
+            self._stage_tracked(dest)
+            self.repo.index.commit(message)
+            return []
         return self.run_command(
             self.init_cmd(dest)
             + [
@@ -50,6 +76,22 @@ class GitManager:
             ]
         )
 
+    def _stage_tracked(self, dest):
+        """Stage modified and deleted tracked files, like commit -a"""
+        if pygit2 is None:
+            return self.run_command(self.init_cmd(dest) + ["add", "--update"])
+
+        repo = pygit2.Repository(dest)
+        index = repo.index
+        for path, flags in repo.status().items():
+            if flags & pygit2.GIT_STATUS_WT_DELETED:
+                index.remove(path)
+            elif flags & (
+                pygit2.GIT_STATUS_WT_MODIFIED | pygit2.GIT_STATUS_WT_TYPECHANGE
+            ):
+                index.add(path)
+        index.write()
+
     def status(self, dest=None):
         """Add a file to the git repository"""
         dest = dest or self.folder or ""
@@ -84,6 +126,8 @@ class GitManager:
     def ls_files(self, dest=None):
         """init an empty repository in a directory of choice"""
         dest = dest or self.folder or ""
+        if self._has_repo(dest):
+            return sorted({path for path, _ in self.repo.index.entries})
         files = self.run_command(self.init_cmd(dest) + ["ls-files"]) or []
         if files:
             return [x for x in files[0].split("\n") if x]
@@ -92,6 +136,9 @@ class GitManager:
     def tag(self, tag, dest=None):
         """Create a tag for a particular commit"""
         dest = dest or self.folder or ""
+        if self._has_repo(dest):
+            Reference.create(self.repo, "refs/tags/%s" % tag, self.repo.head.commit)
+            return []
         return self.run_command(self.init_cmd(dest) + ["tag", tag])
 
     @property
@@ -104,12 +151,13 @@ class GitManager:
         and working tree
         """
         dest = dest or "."
-        git_dir = os.path.join(dest, ".git")
-        return [
-            "git",
-            "--git-dir=%s" % git_dir,
-            "--work-tree=%s" % os.path.dirname(git_dir),
-        ]
+        if dest not in self._init_cmds:
+            self._init_cmds[dest] = (
+                "git",
+                "--git-dir=%s" % os.path.join(dest, ".git"),
+                "--work-tree=%s" % dest,
+            )
+        return list(self._init_cmds[dest])
 
     def run_command(self, cmd):
         """A wrapper to run_command to handle errors"""
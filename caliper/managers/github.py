@@ -3,12 +3,21 @@ __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 import os
-from distutils.version import StrictVersion
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from operator import itemgetter
 
 from caliper.logger import logger
 from caliper.managers.base import ManagerBase
 from caliper.utils.command import do_request
 
+# The last page number in a GitHub Link header
+_LAST_PAGE_RE = re.compile(r'[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+# Cheap check for tags that can possibly be versions (nightly, latest, etc.)
+_VERSION_RE = re.compile(r"^v?\d")
+
 
 class GitHubManager(ManagerBase):
     """Retreive GitHub releases"""
@@ -16,8 +25,11 @@ class GitHubManager(ManagerBase):
     name = "github"
     baseurl = "https://api.github.com"
 
-    def _get_headers(self):
-        """If a GitHub token is found in the environment, use it"""
+    @cached_property
+    def _headers(self):
+        """Request headers, built once. If a GitHub token is found in the
+        environment, use it
+        """
         token = os.environ.get("GITHUB_TOKEN")
         headers = {
             "Accept": "application/vnd.github.symmetra-preview+json",
@@ -26,40 +38,69 @@ class GitHubManager(ManagerBase):
             headers["Authorization"] = "token %s" % token
         return headers
 
+    def _get_pages(self, url):
+        """Get the first page of results, and then any remaining pages (named
+        in the Link header) in parallel.
+        """
+        headers = self._headers
+        results, response_headers = do_request(
+            url, headers=headers, return_headers=True, cache=True
+        )
+        match = _LAST_PAGE_RE.search(response_headers.get("Link", ""))
+        if not match:
+            return results
+
+        urls = [
+            "%s&page=%s" % (url, page) for page in range(2, int(match.group(1)) + 1)
+        ]
+        with ThreadPoolExecutor(max_workers=min(8, len(urls) or 1)) as pool:
+            for page in pool.map(
+                lambda page: do_request(page, headers=headers, cache=True), urls
+            ):
+                results += page
+        return results
+
     def get_package_metadata(self, name=None):
         """Given a package name, retrieve it's metadata from pypi"""
         name = name or self.package_name
         if not name:
             raise ValueError("A package name is required.")
 
-        # At some point we might need to add pagination
-        # url = "%s/repos/%s/releases?per_page=100" % (self.baseurl, name)
-
         # Currently we are using tags, as non verified releases are not included
         url = "%s/repos/%s/tags?per_page=100" % (self.baseurl, name)
-        self.metadata = do_request(url, headers=self._get_headers())
+        self.metadata = self._get_pages(url)
+
+        from packaging.version import InvalidVersion, Version
 
-        # Parse metadata into simplified version of spack package schema
+        # Parse metadata into simplified version of spack package schema,
+        # keeping the parsed version to sort by
+        versions = []
         for release in self.metadata:
             # Only include valid versions
+            if not _VERSION_RE.match(release["name"]):
+                continue
             try:
-                StrictVersion(release["name"].lstrip("v"))
-            except Exception:
+                version = Version(release["name"].lstrip("v"))
+            except InvalidVersion:
                 continue
 
-            self._specs.append(
-                {
-                    "name": name,
-                    "version": release["name"],
-                    "source": {
-                        "filename": release["tarball_url"],
-                        "type": "targz",
+            versions.append(
+                (
+                    version,
+                    {
+                        "name": name,
+                        "version": release["name"],
+                        "source": {
+                            "filename": release["tarball_url"],
+                            "type": "targz",
+                        },
+                        "hash": None,
                     },
-                    "hash": None,
-                }
+                )
             )
 
         # Must sort by version or won't work
-        self._specs = self.sort_specs(self._specs, by="version")
+        versions.sort(key=itemgetter(0))
+        self._specs.extend(spec for _, spec in versions)
         logger.info("Found %s versions for %s" % (len(self._specs), name))
         return self._specs
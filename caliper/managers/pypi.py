@@ -3,11 +3,25 @@ __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 import re
-from copy import deepcopy
+from functools import cached_property
 
 from caliper.logger import logger
 from caliper.managers.base import ManagerBase
-from caliper.utils.command import do_request
+from caliper.utils.command import (
+    cache_response,
+    do_request,
+    get_cached_response,
+    session,
+)
+
+# ijson is optional, and lets us parse only the releases of large responses
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Release archives that we know how to extract
+_ARCHIVE_SUFFIXES = (".tar.gz", ".whl")
 
 
 class PypiManager(ManagerBase):
@@ -17,6 +31,10 @@ class PypiManager(ManagerBase):
     baseurl = "https://pypi.python.org/pypi"
     source_versions = ["cp27", "cp35", "cp38"]
 
+    # Only parse releases from the metadata response (needs ijson). This keeps
+    # memory low for very large responses, but metadata only has releases.
+    stream_releases = False
+
     def do_metadata_request(self, name=None):
         """A separate, shared function to retrieve package metadata without
         doing any custom filtering.
@@ -25,10 +43,37 @@ class PypiManager(ManagerBase):
         if not name:
             raise ValueError("A package name is required.")
 
-        url = "%s/%s/json" % (self.baseurl, name)
-        self.metadata = do_request(url)
+        # Properties derived from the metadata are computed again
+        for derived in ["releases", "release_python_versions", "source_only"]:
+            self.__dict__.pop(derived, None)
 
-    @property
+        url = "%s/%s/json" % (self.baseurl, name)
+        if ijson is not None and self.stream_releases:
+            self.metadata = {"releases": self._stream_releases(url)}
+        else:
+            self.metadata = do_request(url, cache=True)
+
+    def _stream_releases(self, url):
+        """Parse only the releases from the metadata response, without building
+        the (much larger) package description and other fields.
+        """
+        cache_url = "%s#releases" % url
+        headers = {}
+        cached = get_cached_response(cache_url, headers)
+        with session.get(url, stream=True, headers=headers) as response:
+            if cached and response.status_code == 304:
+                return cached["content"]
+            if response.status_code != 200:
+                logger.exit(
+                    "Error with %s: %s, %s"
+                    % (url, response.status_code, response.reason)
+                )
+            response.raw.decode_content = True
+            releases = dict(ijson.kvitems(response.raw, "releases", use_float=True))
+        cache_response(cache_url, response, releases)
+        return releases
+
+    @cached_property
     def source_only(self):
         """We care that a package is source only so we know to use artifically
         generated self.source_versions instead. Ideally this matches an install
@@ -38,16 +83,16 @@ class PypiManager(ManagerBase):
         3) that a package is a combination of source and wheels
         We don't handle well the case that a package was 1 or 2 and then switches.
         """
-        if not hasattr(self, "_source_only"):
-            self._source_only = True
-            for _, releases in self.releases.items():
-                for release in releases:
-                    if release["python_version"] != "source":
-                        self._source_only = False
-                        return self._source_only
-        return self._source_only
-
-    @property
+        return self.release_python_versions <= {"source"}
+
+    @cached_property
+    def release_python_versions(self):
+        """The set of python_version values across all releases"""
+        return {
+            r["python_version"] for releases in self.releases.values() for r in releases
+        }
+
+    @cached_property
     def releases(self):
         if not self.metadata:
             self.do_metadata_request()
@@ -60,72 +105,71 @@ class PypiManager(ManagerBase):
         """
         # Note that without specifying an arch and python version, the
         # architecture returned can be fairly random.
+        name = name or self.package_name
+        arch_re, python_re = self._compile_release_filters(arch, python_version)
 
-        # Parse metadata into simplified version of spack package schema
-        for version, releases in self.releases.items():
-            # Find an appropriate linux/unix flavor release to extract
-            release = self.find_release(releases, arch, python_version)
-
-            # Some releases can be empty, skip
-            if not releases or not release:
-                continue
+        # Find an appropriate linux/unix flavor release to extract for each version
+        chosen = [
+            (version, self._find_release(releases, arch_re, python_re))
+            for version, releases in self.releases.items()
+        ]
 
-            # Release type drives the extraction logic
-            release_type = "wheel" if release["url"].endswith("whl") else "targz"
-            self._specs.append(
-                {
-                    "name": name,
-                    "version": version,
-                    "source": {
-                        "filename": release["url"],
-                        "type": release_type,
-                    },
-                    "hash": release["digests"]["sha256"],
-                }
-            )
+        # Parse metadata into simplified version of spack package schema
+        # Some releases can be empty, and the release type drives extraction
+        self._specs.extend(
+            {
+                "name": name,
+                "version": version,
+                "source": {
+                    "filename": release["url"],
+                    "type": "wheel" if release["url"].endswith(".whl") else "targz",
+                },
+                "hash": release["digests"]["sha256"],
+            }
+            for version, release in chosen
+            if release
+        )
 
         # Pypi is already sorted by version (at least it seems)
-        logger.info(
-            "Found %s versions for %s" % (len(self._specs), name or self.package_name)
-        )
+        logger.info("Found %s versions for %s" % (len(self._specs), name))
         return self._specs
 
     def get_python_versions(self):
         """Given a list of releases (or the default) return a list of pep
         Python versions (e.g., cp38)
         """
-        python_versions = set()
-        for version, releases in self.releases.items():
-            for r in releases:
-                if r["python_version"] and r["python_version"] != "source":
-                    python_versions.add(r["python_version"])
-
-                # If we have source, we can only test it over a range of versions
-                elif (
-                    r["python_version"]
-                    and r["python_version"] == "source"
-                    and self.source_only
-                ):
-                    [
-                        python_versions.add(source_version)
-                        for source_version in self.source_versions
-                    ]
+        python_versions = {x for x in self.release_python_versions if x}
 
+        # If we have source, we can only test it over a range of versions
+        if "source" in python_versions:
+            python_versions.remove("source")
+            if self.source_only:
+                python_versions.update(self.source_versions)
         return python_versions
 
     def find_release(self, releases, arch=None, python_version=None):
         """Given a list of releases, find one that we can extract"""
-        filename = None
+        return self._find_release(
+            releases, *self._compile_release_filters(arch, python_version)
+        )
+
+    def _compile_release_filters(self, arch=None, python_version=None):
+        """Compile the arch and python version patterns for _find_release"""
+        arch_re = re.compile(arch) if arch else None
+        python_re = re.compile("cp%s" % python_version) if python_version else None
+        return arch_re, python_re
 
-        if arch:
-            releases = [r for r in releases if re.search(arch, r["filename"])]
-        if python_version:
-            releases = [
-                r for r in releases if re.search("cp%s" % python_version, r["filename"])
-            ]
+    def _find_release(self, releases, arch_re=None, python_re=None):
+        """find_release with already compiled arch and python version patterns"""
+        filename = None
 
+        # One pass over releases, the last matching archive is used
         for release in releases:
-            if re.search("(tar[.]gz|[.]whl)", release["url"]):
+            if arch_re and not arch_re.search(release["filename"]):
+                continue
+            if python_re and not python_re.search(release["filename"]):
+                continue
+            if release["url"].endswith(_ARCHIVE_SUFFIXES):
                 filename = release
         return filename
 
@@ -135,18 +179,17 @@ class PypiManager(ManagerBase):
         Python to use, so we return a set that ranges between 2.7 and 3.8.
         """
         filtered = {}
+        pattern = re.compile(regex)
         for version, releases in self.releases.items():
             subset = []
 
             # Only add releases that match regular expression
             for r in releases:
-                if re.search(regex, r.get(search_field, "")):
+                if pattern.search(r.get(search_field, "")):
                     # We only added sources if there aren't wheels
                     if r["python_version"] == "source" and self.source_only:
                         for source_version in self.source_versions:
-                            rcopy = deepcopy(r)
-                            rcopy["python_version"] = source_version
-                            subset.append(rcopy)
+                            subset.append({**r, "python_version": source_version})
                     else:
                         subset.append(r)
             filtered[version] = subset
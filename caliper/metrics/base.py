@@ -5,7 +5,8 @@ __license__ = "MPL 2.0"
 import os
 from abc import abstractmethod
 from collections.abc import Mapping
-from distutils.version import StrictVersion
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 from caliper.logger import logger
 from caliper.utils.file import get_tmpdir, mkdir_p, read_json, write_json, write_zip
@@ -62,18 +63,27 @@ class MetricBase:
         self._setup_save(package_dir, "json", force)
         extractor_dir = os.path.join(package_dir, self.name)
 
-        # Organize results by version inside of separate files
-        for label in labels:
-            result_file = os.path.join(extractor_dir, "%s-%s.json" % (self.name, label))
-            newresult = {label: results[label]}
-            urls.append(os.path.basename(result_file))
-            if os.path.exists(result_file) and force is False:
-                logger.warning(
-                    "Result file %s already exists and force is False, skipping overwrite."
-                    % result_file
+        # Organize results by version inside of separate files, written by threads
+        with ThreadPoolExecutor(max_workers=min(8, len(labels) or 1)) as pool:
+            futures = []
+            for label in labels:
+                result_file = os.path.join(
+                    extractor_dir, "%s-%s.json" % (self.name, label)
+                )
+                urls.append(os.path.basename(result_file))
+                if os.path.exists(result_file) and force is False:
+                    logger.warning(
+                        "Result file %s already exists and force is False, skipping overwrite."
+                        % result_file
+                    )
+                    continue
+                futures.append(
+                    pool.submit(write_json, {label: results[label]}, result_file)
                 )
-                continue
-            write_json(newresult, result_file)
+
+            # Surface any error from a write
+            for future in futures:
+                future.result()
 
         # Update the index to include the (relative) list of files
         self.update_index(extractor_dir, {"json": {"urls": urls}})
@@ -115,8 +125,14 @@ class MetricBase:
         and the intended filename.
         """
         # Each metric has it's own subfolder
+        # The package directory is usually already created by save_all
         extractor_dir = os.path.join(package_dir, self.name)
-        mkdir_p(extractor_dir)
+        try:
+            os.mkdir(extractor_dir)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            mkdir_p(extractor_dir)
 
         # Prepare to write results to file
         if fmt in ["json-single", "zip"]:
@@ -133,12 +149,12 @@ class MetricBase:
         exist, write a new one. Filepaths should be relative.
         """
         index_file = os.path.join(extractor_dir, "index.json")
-        if not os.path.exists(index_file):
+        if os.path.exists(index_file):
+            index = read_json(index_file)
+        else:
             index = {"data": {}}
-            write_json(index, index_file)
 
-        # Read in the index and update it
-        index = read_json(index_file)
+        # Update the index and write it once
         index["data"].update(content)
         write_json(index, index_file)
 
@@ -181,22 +197,22 @@ class ChangeMetricBase(MetricBase):
         """Given a list of change versions, the labels should be returned sorted
         including any EMPTY declarations, which need to be moved to the beginning
         """
-        labels = list(self._data)
+        from packaging.version import Version
 
-        # Remove EMPTY label before sorting
+        # Set aside the EMPTY label, and pair the rest with their first version
         empty = None
-        for label in labels:
-            if "EMPTY" in label:
-                empty = labels.pop(labels.index(label))
-                break
-
-        lookup = {x.split("..")[0].lstrip("v"): x for x in labels}
-        pairs = [x.split("..") for x in labels]
-        versions = [pair[0].lstrip("v") for pair in pairs]
-        versions.sort(key=StrictVersion)
+        versions = []
+        for label in self._data:
+            if empty is None and "EMPTY" in label:
+                empty = label
+                continue
+            versions.append((Version(label.split("..", 1)[0].lstrip("v")), label))
+
+        versions.sort(key=itemgetter(0))
+        labels = [label for _, label in versions]
         if empty:
-            return [empty] + [lookup[x] for x in versions]
-        return [lookup[x] for x in versions]
+            return [empty] + labels
+        return labels
 
     def iter_tags(self):
         """yield a tag, it's parent, and a string to describe the two for an
@@ -219,14 +235,22 @@ class MetricFinder(Mapping):
 
     _metrics = {}
 
+    # Metrics found for a path, keyed by the path and its modified time
+    _found = {}
+
     def __init__(self, metrics_path=None):
         # Default to the collection folder, add to metrics cache if not there
         self.metrics_path = metrics_path or os.path.join(here, "collection")
         self.update()
 
     def update(self):
-        """Add a new path to the metrics cache, if it doesn't exist"""
-        self._metrics = self._find_metrics()
+        """Add a new path to the metrics cache, if it doesn't exist. The path
+        is only searched again if it has changed since it was last found.
+        """
+        key = (self.metrics_path, os.stat(self.metrics_path).st_mtime_ns)
+        if key not in self._found:
+            self._found[key] = self._find_metrics()
+        self._metrics = self._found[key]
 
     def _find_metrics(self):
         """Find metrics based on listing folders under the metrics collection
@@ -234,27 +258,27 @@ class MetricFinder(Mapping):
         """
         # Create a metric lookup dictionary
         metrics = {}
-        for metric_name in os.listdir(self.metrics_path):
-            metric_dir = os.path.join(self.metrics_path, metric_name)
-            metric_file = os.path.join(metric_dir, "metric.py")
-
-            # Skip files in collection folder
-            if os.path.isfile(metric_dir):
-                continue
-
-            # Continue if the file doesn't exist
-            if not os.path.exists(metric_file):
-                logger.debug(
-                    "%s does not appear to have a metric.py, skipping." % metric_dir
+        with os.scandir(self.metrics_path) as entries:
+            for entry in entries:
+                # Skip files in collection folder
+                if not entry.is_dir():
+                    continue
+                metric_name = entry.name
+                metric_file = os.path.join(entry.path, "metric.py")
+
+                # Continue if the file doesn't exist
+                if not os.path.exists(metric_file):
+                    logger.debug(
+                        "%s does not appear to have a metric.py, skipping." % entry.path
+                    )
+                    continue
+
+                # The class name means we split by underscore, capitalize, and join
+                class_name = "".join(x.capitalize() for x in metric_name.split("_"))
+                metrics[metric_name] = "caliper.metrics.collection.%s.metric.%s" % (
+                    metric_name,
+                    class_name,
                 )
-                continue
-
-            # The class name means we split by underscore, capitalize, and join
-            class_name = "".join([x.capitalize() for x in metric_name.split("_")])
-            metrics[metric_name] = "caliper.metrics.collection.%s.metric.%s" % (
-                metric_name,
-                class_name,
-            )
         return metrics
 
     def __getitem__(self, name):
@@ -3,18 +3,18 @@ __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
 import importlib
-import json
 import os
 import shutil
 import tempfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 
-import requests
-
-from caliper.logger import logger
+from caliper.logger import DEBUG, logger
 from caliper.managers import GitManager, get_named_manager
 from caliper.metrics.base import MetricFinder
-from caliper.utils.file import read_json, read_zip, zip_from_string
+from caliper.utils.command import get_all, response_json, session
+from caliper.utils.file import load_json, mkdir_p, move_files, read_json, read_zip
 from caliper.utils.prompt import confirm
 
 
@@ -33,19 +33,34 @@ class MetricsExtractor:
     The source should be a url we can download with wget or similar.
     """
 
-    def __init__(self, manager=None, working_dir=None, quiet=False):
+    # Metrics loaded from a repository, least recently used first
+    _loaded = OrderedDict()
+    _loaded_max = 16
+
+    def __init__(self, manager=None, working_dir=None, quiet=False, jobs=8):
         self._metrics = {}
+        self._metric_classes = {}
         self._extractors = {}
         self.manager = manager
         self.tmpdir = None
         self.git = None
         self.quiet = quiet
+        self.jobs = jobs
 
         # If we have a working directory provided, the repository exists
         if working_dir:
             self.tmpdir = working_dir
             self.git = GitManager(self.tmpdir)
 
+    def set_manager(self, manager):
+        """Bind a new manager, keeping the discovered metrics. Extractors and
+        the prepared repository belong to the previous manager and are reset.
+        """
+        self.manager = manager
+        self._extractors = {}
+        self.tmpdir = None
+        self.git = None
+
     def __iter__(self):
         for name, result in self._extractors.items():
             yield name, result
@@ -63,24 +78,48 @@ class MetricsExtractor:
         """Load a metric from from a file, local caliper repository, or GitHub
         repo that has them extracted, optionally specifying a custom repository
         and subfolder. Smaller metrics are typically provided via json, and
-        larger ones via zip.
+        larger ones via zip. Metrics loaded from a repository are cached (and
+        shared) across extractors, see clear_cache.
         """
         # A manager is required
         if not self.manager:
             logger.exit("A manager is required to load a metric for.")
 
+        # Local files can change between loads, so they are always read
         if local_repository:
             return self._load_metric_local(local_repository, metric)
         elif filename:
             return self._load_metric_file(filename, metric)
-        return self._load_metric_repo(metric, repository, subfolder, branch, extension)
+
+        # Key on the manager uri, not the object, so equal managers share a result
+        manager = getattr(self.manager, "uri", self.manager)
+        key = (manager, metric, repository, subfolder, branch, extension)
+        if key in self._loaded:
+            self._loaded.move_to_end(key)
+            return self._loaded[key]
+
+        result = self._load_metric_repo(
+            metric, repository, subfolder, branch, extension
+        )
+
+        # Don't keep a failed load, so the next call tries again
+        if result:
+            self._loaded[key] = result
+            if len(self._loaded) > self._loaded_max:
+                self._loaded.popitem(last=False)
+        return result
+
+    @classmethod
+    def clear_cache(cls):
+        """Clear metrics kept by load_metric, e.g., to free memory or reload"""
+        cls._loaded.clear()
 
     def _load_metric_file(self, filename, metric):
         """helper function to load a metric from a filename. If it's zipped,"""
         name = "%s-results.json" % metric
         if filename.endswith("zip"):
-            return json.loads(read_zip(filename, name))
-        return read_json(name)
+            return load_json(read_zip(filename, name))
+        return read_json(filename)
 
     def _load_metric_repo(self, metric, repository, subfolder, branch, extension):
         """helper function to load a metric from a repository."""
@@ -99,9 +138,9 @@ class MetricsExtractor:
         )
 
         logger.info("Downloading %s" % url)
-        response = requests.get(url)
+        response = session.get(url)
         if response.status_code == 200:
-            index = response.json()
+            index = response_json(response)
             data = index.get("data", {})
 
             # Parse a metric repository, meaning reading the index.json
@@ -120,7 +159,7 @@ class MetricsExtractor:
 
         if "zip" in data:
             metric_file = os.path.join(metric_dir, data["zip"].get("url", ""))
-            return json.loads(read_zip(metric_file, "%s-results.json" % metric))
+            return load_json(read_zip(metric_file, "%s-results.json" % metric))
 
         elif "json" in data:
             results = {}
@@ -135,24 +174,32 @@ class MetricsExtractor:
         """
         if preferred == "json" and "json-single" in data:
             url = "%s/%s" % (os.path.dirname(url), data["json-single"]["url"])
-            response = requests.get(url)
+            response = session.get(url)
             if response.status_code == 200:
-                return response.json()
+                return response_json(response)
 
         elif preferred == "zip" and "zip" in data:
-            response = requests.get(url, stream=True)
-            data = zip_from_string(
-                response.content, filename="%s-results.json" % metric
-            )
-            return json.loads(data)
+            url = "%s/%s" % (os.path.dirname(url), data["zip"]["url"])
+            response = session.get(url, stream=True)
+            if response.status_code == 200:
+                # Stream the archive, only spilling to disk if it's large
+                with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as zf:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        zf.write(chunk)
+                    zf.seek(0)
+                    return load_json(read_zip(zf, "%s-results.json" % metric))
 
         elif preferred == "json" and "json" in data:
             results = {}
-            for filename in data["json"].get("urls", []):
-                url = "%s/%s" % (os.path.dirname(url), filename)
-                response = requests.get(url)
+            urls = [
+                "%s/%s" % (os.path.dirname(url), filename)
+                for filename in data["json"].get("urls", [])
+            ]
+
+            # Files are fetched concurrently, and merged in order
+            for response in get_all(urls):
                 if response.status_code == 200:
-                    results.update(response.json())
+                    results.update(response_json(response))
             return results
 
     @property
@@ -189,23 +236,29 @@ class MetricsExtractor:
         if not self.git:
             self.prepare_repository(versions)
 
-        module, metric_name = self._metrics[name].rsplit(".", 1)
         metric = self.get_metric(name)
         metric.extract()
-        self._extractors[metric_name] = metric
+        self._extractors[type(metric).__name__] = metric
 
     def get_metric(self, name):
         """Return a metric object based on name"""
-        module, metric_name = self._metrics[name].rsplit(".", 1)
-        return getattr(importlib.import_module(module), metric_name)(self.git)
+        if name not in self._metric_classes:
+            module, metric_name = self._metrics[name].rsplit(".", 1)
+            self._metric_classes[name] = getattr(
+                importlib.import_module(module), metric_name
+            )
+        return self._metric_classes[name](self.git)
 
-    def prepare_repository(self, versions=None):
+    def prepare_repository(self, versions=None, jobs=None):
         """Since most source code archives won't include the git history,
         we would want to create a root directly with a new git installation,
         and then create tagged commits that correpond to each version. We
         can then use this git repository to derive metrics of change.
+        Up to jobs versions (defaulting to the extractor's jobs) are downloaded
+        in parallel, and committed in order.
         """
         versions = versions or []
+        jobs = jobs or self.jobs
         if not self.manager:
             logger.exit("A manager is required to prepare a repository.")
 
@@ -221,26 +274,52 @@ class MetricsExtractor:
         # If we have versions, filter down
         self.filter_versions(versions)
 
-        # For each version, download and create git commit and tag
-        for i, spec in enumerate(self.manager.specs):
-            logger.info(
-                "Downloading and tagging %s, %s of %s"
-                % (spec["version"], i + 1, len(self.manager.specs))
-            )
+        # Each version is downloaded to its own folder before it is committed
+        staging = tempfile.mkdtemp(
+            prefix="%s-downloads-" % os.path.basename(self.tmpdir)
+        )
+        specs = list(enumerate(self.manager.specs))
 
-            # The manager should provide it's own download function
-            self.manager.download(spec, self.tmpdir)
+        def download(i, spec):
+            dest = os.path.join(staging, str(i))
+            os.mkdir(dest)
 
-            # git add all content in folder, commit and tag with version
-            self.git.add()
-            self.git.status()
-            os.listdir(self.tmpdir)
-            self.git.commit(spec["version"])
-            self.git.tag(spec["version"])
+            # The manager should provide it's own download function
+            self.manager.download(spec, dest)
+            return dest
+
+        # Keep a limited number of versions downloading ahead of commits
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = deque()
+                for i, spec in specs:
+                    futures.append((i, spec, pool.submit(download, i, spec)))
+                    if len(futures) >= 2 * jobs:
+                        self._commit_version(*futures.popleft(), total=len(specs))
+                while futures:
+                    self._commit_version(*futures.popleft(), total=len(specs))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
 
         logger.info("Repository for %s is created at %s" % (self.manager, self.tmpdir))
         return self.git
 
+    def _commit_version(self, i, spec, future, total):
+        """Once a version is downloaded, move it into the repository and create
+        a commit and tag for it.
+        """
+        logger.info("Tagging %s, %s of %s" % (spec["version"], i + 1, total))
+        download_dir = future.result()
+        move_files(download_dir, self.tmpdir)
+        os.rmdir(download_dir)
+
+        # git add all content in folder, commit and tag with version
+        self.git.add()
+        if not self.quiet and logger.isEnabledFor(DEBUG):
+            self.git.status()
+        self.git.commit(spec["version"])
+        self.git.tag(spec["version"])
+
     def filter_versions(self, versions=None):
         """Given a list of versions, filter down the specs to only include
         the ones in the list
@@ -269,18 +348,27 @@ class MetricsExtractor:
             outdir, self.manager.name, self.manager.uri.replace("/", "-")
         )
         logger.info("Results will be written to %s" % package_dir)
-
-        for _, extractor in self._extractors.items():
-            # Each metric can define a default format
-            fmt_ = fmt or extractor.extractor
-
-            # Do save based on selected type
-            if fmt_ == "json-single":
-                extractor.save_json_single(package_dir, force=force)
-            elif fmt_ == "zip":
-                extractor.save_zip(package_dir, force=force)
-            else:
-                extractor.save_json(package_dir, force=force)
+        mkdir_p(package_dir)
+
+        # Each extractor writes to its own folder, so they are saved in parallel
+        with ThreadPoolExecutor(max_workers=min(8, len(self._extractors))) as pool:
+            futures = []
+            for _, extractor in self._extractors.items():
+                # Each metric can define a default format
+                fmt_ = fmt or extractor.extractor
+
+                # Do save based on selected type
+                if fmt_ == "json-single":
+                    save = extractor.save_json_single
+                elif fmt_ == "zip":
+                    save = extractor.save_zip
+                else:
+                    save = extractor.save_json
+                futures.append(pool.submit(save, package_dir, force=force))
+
+            # Surface any error from a save
+            for future in futures:
+                future.result()
 
 
 class MetricsUpdater(MetricsExtractor):
@@ -2,6 +2,8 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import asyncio
+import hashlib
 import json
 import os
 import shutil
@@ -10,16 +12,100 @@ import sys
 import tarfile
 import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from caliper.logger import logger
-from caliper.utils.file import move_files
+from caliper.utils.file import mkdir_p, move_files, read_json, write_json
+
+# orjson is optional, and much faster to parse large responses
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# httpx (with h2) is optional, and can multiplex requests to a host over HTTP/2
+try:
+    import h2  # noqa
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def get_session():
+    """Get a requests session that keeps connections open (and retries
+    transient server errors) so repeated requests to a host are cheaper.
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# A shared session for downloads and API requests
+session = get_session()
+
+# Response headers kept with cached responses
+CACHED_HEADERS = ["ETag", "Last-Modified", "Link"]
+
+
+def get_cache_file(url):
+    """Get the path of the response cache for a url. The cache directory
+    defaults to ~/.cache/caliper, and can be set with CALIPER_CACHE.
+    """
+    cache_dir = os.environ.get(
+        "CALIPER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "caliper")
+    )
+    return os.path.join(
+        cache_dir, "http", "%s.json" % hashlib.sha256(url.encode("utf-8")).hexdigest()
+    )
+
+
+def get_cached_response(url, headers=None):
+    """If a response for the url is cached, return it, and add conditional
+    request headers (so the server can respond with 304 if unchanged).
+    """
+    cache_file = get_cache_file(url)
+    if not os.path.exists(cache_file):
+        return
+
+    # A cache that can't be read is ignored, the request is made in full
+    try:
+        cached = read_json(cache_file)
+    except (OSError, ValueError):
+        logger.debug("Cannot read cached response %s, ignoring." % cache_file)
+        return
+    if headers is not None:
+        if cached["headers"].get("ETag"):
+            headers["If-None-Match"] = cached["headers"]["ETag"]
+        if cached["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = cached["headers"]["Last-Modified"]
+    return cached
+
+
+def cache_response(url, response, content):
+    """Cache parsed content for a response, if it can be validated later"""
+    headers = {k: response.headers[k] for k in CACHED_HEADERS if k in response.headers}
+    if "ETag" not in headers and "Last-Modified" not in headers:
+        return
+    cache_file = get_cache_file(url)
+
+    # The cache is optional, e.g., a read only home shouldn't fail the request
+    try:
+        mkdir_p(os.path.dirname(cache_file))
+        write_json({"headers": headers, "content": content}, cache_file, pretty=False)
+    except OSError as e:
+        logger.debug("Cannot cache response to %s: %s" % (cache_file, e))
 
 
 def wget(url, download_to, chunk_size=1024):
     """mimicking wget using requests"""
-    response = requests.get(url, stream=True)
+    response = session.get(url, stream=True)
     with open(download_to, "wb") as fd:
         for chunk in response.iter_content(chunk_size=chunk_size):
             if chunk:
@@ -92,11 +178,26 @@ def wget_and_extract_zip(url, download_to, chunk_size=1024):
     return download_to, download_root, download_dir
 
 
-def do_request(url, headers=None, data=None, method="GET"):
+def do_request(
+    url, headers=None, data=None, method="GET", return_headers=False, cache=False
+):
     """A general function to do a request, and handle any possible error
-    codes.
+    codes. If return_headers is True, return a tuple with the response headers.
+    If cache is True, GET responses are cached and revalidated with the server.
     """
-    response = requests.request(method, url, headers=headers, data=json.dumps(data))
+    cached = None
+    cache = cache and method == "GET"
+    if cache:
+        headers = dict(headers or {})
+        cached = get_cached_response(url, headers)
+
+    response = session.request(method, url, headers=headers, data=json.dumps(data))
+
+    # The server has confirmed the cached response is current
+    if cached and response.status_code == 304:
+        if return_headers:
+            return cached["content"], cached["headers"]
+        return cached["content"]
 
     if response.status_code not in [200, 201]:
         # Try to serialize the message, if possible
@@ -108,6 +209,42 @@ def do_request(url, headers=None, data=None, method="GET"):
             f"Error with {url}: {response.status_code}, {response.reason}\n{message}"
         )
 
+    result = response_json(response)
+    if cache:
+        cache_response(url, response, result)
+    if return_headers:
+        return result, response.headers
+    return result
+
+
+def get_all(urls, workers=8):
+    """GET a list of urls concurrently, returning responses in the same order.
+    With httpx installed the requests share an HTTP/2 connection to each host,
+    otherwise they are spread over threads using the shared session.
+    """
+    if httpx is not None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(_get_all_async(urls))
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls) or 1)) as pool:
+        return list(pool.map(session.get, urls))
+
+
+async def _get_all_async(urls):
+    """Asynchronously GET a list of urls with one HTTP/2 client"""
+    async with httpx.AsyncClient(http2=True, follow_redirects=True) as client:
+        return await asyncio.gather(*[client.get(url) for url in urls])
+
+
+def response_json(response):
+    """Parse the json content of a response, using orjson if installed"""
+    if orjson is not None:
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            pass
     return response.json()
 
 
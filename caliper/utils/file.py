@@ -2,9 +2,10 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import copy
 import errno
 import fnmatch
-import io
+import functools
 import json
 import os
 import shutil
@@ -13,6 +14,15 @@ import zipfile
 
 import yaml
 
+# orjson is optional, and much faster to serialize large results
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Use the libyaml (C) loader when pyyaml was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def write_zip(members, saveto):
     """Given a dictionary with filenames (keys) and data (values),
@@ -26,7 +36,11 @@ def write_zip(members, saveto):
     with zipfile.ZipFile(saveto, "w") as zf:
         for filename, content in members.items():
             if isinstance(content, dict):
-                content = json.dumps(content)
+                content = (
+                    orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+                    if orjson is not None
+                    else json.dumps(content)
+                )
             zf.writestr(filename, content)
     return saveto
 
@@ -43,18 +57,6 @@ def read_zip(zipname, filename):
             return zf.read(filename)
 
 
-def zip_from_string(zipdata, filename=None):
-    """Given zipdata (for example, provided from a request) load it into
-    a zip object so we can then extract it (or otherwise parse it)
-    """
-    # Read into in-memory zip, return specific file or lookup of files
-    memzip = zipfile.ZipFile(io.BytesIO(zipdata))
-    if not filename:
-        return {name: memzip.read(name) for name in memzip.namelist()}
-    elif filename in memzip.namelist():
-        return memzip.read(filename)
-
-
 def move_files(source, dest):
     """move one or more files from a source to a destination"""
     moved_files = []
@@ -64,12 +66,18 @@ def move_files(source, dest):
         topath = os.path.join(dest, path)
 
         # If a file already exists, remove it
-        if os.path.exists(topath) and os.path.isfile(topath):
-            os.remove(topath)
-        elif os.path.exists(topath) and os.path.isdir(topath):
+        if os.path.isdir(topath) and not os.path.islink(topath):
             shutil.rmtree(topath)
+        elif os.path.lexists(topath):
+            os.remove(topath)
 
-        shutil.move(frompath, dest)
+        # A rename is enough on the same filesystem, otherwise copy
+        try:
+            os.replace(frompath, topath)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(frompath, topath)
         moved_files.append(topath)
     return moved_files
 
@@ -118,34 +126,66 @@ def write_file(filename, content):
 
 
 def read_yaml(filename):
-    """Given a yaml file, read with pyaml"""
-    stream = read_file(filename, readlines=False)
-    return yaml.load(stream, Loader=yaml.FullLoader)
+    """Given a yaml file, read with pyaml. Parsed content is cached until the
+    file is modified, and a copy is returned so callers can change it.
+    """
+    mtime_ns = os.stat(filename).st_mtime_ns
+    return copy.deepcopy(_read_yaml_cached(os.path.abspath(filename), mtime_ns))
+
+
+@functools.lru_cache(maxsize=16)
+def _read_yaml_cached(filename, mtime_ns):
+    """Parse a yaml file, keyed on modification time (see read_yaml)"""
+    with open(filename, "rb") as fd:
+        return yaml.load(fd, Loader=YamlLoader)
 
 
 def write_json(json_obj, filename, pretty=True):
-    """write_json will write a json object to file, pretty printed
+    """write_json will write a json object to file, pretty printed with an
+    indent of 2 (the same with or without orjson installed)
 
     Arguents:
      - json_obj (dict) : the dict to print to json
      - filename (str) : the output file to write to
     """
-    with open(filename, "w") as filey:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
         if pretty:
-            filey.writelines(json.dumps(json_obj, indent=4, separators=(",", ": ")))
+            option |= orjson.OPT_INDENT_2
+        with open(filename, "wb") as filey:
+            filey.write(orjson.dumps(json_obj, option=option))
+        return filename
+
+    # Match the orjson output. Indented output is encoded in pieces anyway,
+    # so write them as they come
+    with open(filename, "w", encoding="utf-8") as filey:
+        if pretty:
+            json.dump(json_obj, filey, indent=2, ensure_ascii=False)
         else:
-            filey.writelines(json.dumps(json_obj))
+            filey.write(json.dumps(json_obj, separators=(",", ":"), ensure_ascii=False))
     return filename
 
 
+def load_json(content):
+    """Parse json from a string or bytes, using orjson if installed. orjson
+    rejects NaN and Infinity, which json (and older caliper results) write.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
 def read_json(input_file):
     """Read json from an input file.
 
     Arguments:
       - input_file (str) : the filename to read
     """
-    with open(input_file, "r") as filey:
-        data = json.loads(filey.read())
+    with open(input_file, "rb") as filey:
+        data = load_json(filey.read())
     return data
 
 
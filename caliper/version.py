@@ -20,9 +20,22 @@ INSTALL_REQUIRES = (
     ("GitPython", {"min_version": "3.1.7"}),
     ("pyaml", {"min_version": "20.4.0"}),
     ("Jinja2", {"min_version": "2.11.2"}),
+    ("packaging", {"min_version": "20.0"}),
 )
 JEDI_REQUIRES = (("jedi", {"exact_version": "0.18.0"}),)
 TESTS_REQUIRES = (("pytest", {"min_version": "4.6.2"}),)
 DATAVERSE_REQUIRES = (("pyDataverse", {"exact_version": "0.2.1"}),)
+ORJSON_REQUIRES = (("orjson", {"min_version": "3.6.0"}),)
+IJSON_REQUIRES = (("ijson", {"min_version": "3.1"}),)
+HTTPX_REQUIRES = (("httpx[http2]", {"min_version": "0.20.0"}),)
+PYGIT2_REQUIRES = (("pygit2", {"min_version": "1.2.0"}),)
 
-ALL_REQUIRES = INSTALL_REQUIRES + JEDI_REQUIRES + DATAVERSE_REQUIRES
+ALL_REQUIRES = (
+    INSTALL_REQUIRES
+    + JEDI_REQUIRES
+    + DATAVERSE_REQUIRES
+    + ORJSON_REQUIRES
+    + IJSON_REQUIRES
+    + HTTPX_REQUIRES
+    + PYGIT2_REQUIRES
+)
@@ -71,6 +71,10 @@ if __name__ == "__main__":
     ALL_REQUIRES = get_reqs(lookup, "ALL_REQUIRES")
     DATAVERSE_REQUIRES = get_reqs(lookup, "DATAVERSE_REQUIRES")
     JEDI_REQUIRES = get_reqs(lookup, "JEDI_REQUIRES")
+    ORJSON_REQUIRES = get_reqs(lookup, "ORJSON_REQUIRES")
+    IJSON_REQUIRES = get_reqs(lookup, "IJSON_REQUIRES")
+    HTTPX_REQUIRES = get_reqs(lookup, "HTTPX_REQUIRES")
+    PYGIT2_REQUIRES = get_reqs(lookup, "PYGIT2_REQUIRES")
 
     setup(
         name=NAME,
@@ -95,6 +99,10 @@ if __name__ == "__main__":
             "all": ALL_REQUIRES,
             "dataverse": DATAVERSE_REQUIRES,
             "jedi": JEDI_REQUIRES,
+            "orjson": ORJSON_REQUIRES,
+            "ijson": IJSON_REQUIRES,
+            "httpx": HTTPX_REQUIRES,
+            "pygit2": PYGIT2_REQUIRES,
         },
         classifiers=[
             "Intended Audience :: Science/Research",
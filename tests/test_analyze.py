@@ -30,6 +30,7 @@ def test_pypi_analyze(tmp_path):
     for key in [
         "dependency",
         "outfile",
+        "dockerfile_path",
         "dockerfile",
         "force",
         "exists",
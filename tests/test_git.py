@@ -31,3 +31,32 @@ def test_git_manager_new(tmp_path):
     git = GitManager()
     git.init(git_dir)
     git.status(git_dir)
+
+
+def test_git_manager_commit_tracked(tmp_path, monkeypatch):
+    """test that commit includes changes to tracked files, like commit -a"""
+    import caliper.managers.git as manager
+
+    for use_pygit2 in [True, False]:
+        if not use_pygit2:
+            monkeypatch.setattr(manager, "pygit2", None)
+        git_dir = os.path.join(str(tmp_path), "git-%s" % use_pygit2)
+        git = manager.GitManager(git_dir, quiet=True)
+        git.init()
+        for name in ["kept.txt", "removed.txt", "untracked.txt"]:
+            with open(os.path.join(git_dir, name), "w") as fd:
+                fd.write("pancakes!")
+        git.add("kept.txt")
+        git.add("removed.txt")
+        git.commit("Adding content!")
+
+        # Change and remove tracked files, and commit without adding
+        with open(os.path.join(git_dir, "kept.txt"), "w") as fd:
+            fd.write("waffles!")
+        os.remove(os.path.join(git_dir, "removed.txt"))
+        git.commit("Changing content!")
+
+        tree = git.repo.head.commit.tree
+        assert [blob.path for blob in tree.blobs] == ["kept.txt"]
+        assert tree["kept.txt"].data_stream.read() == b"waffles!"
+        monkeypatch.undo()
@@ -42,3 +42,74 @@ def test_github_manager(tmp_path):
 
     for key in ["filename", "type"]:
         assert key in manager.specs[0]["source"]
+
+
+def test_sort_specs():
+    """test that sort_specs sorts the specs it is given, by version"""
+    from caliper.managers import PypiManager
+
+    manager = PypiManager("pypi:sif")
+    manager._specs = [{"version": "0.0.1"}]
+    specs = [{"version": v} for v in ["1.10", "v1.2", "1.0rc1", "0.9"]]
+
+    ordered = manager.sort_specs(specs)
+    assert [x["version"] for x in ordered] == ["0.9", "1.0rc1", "v1.2", "1.10"]
+    assert manager._specs == [{"version": "0.0.1"}]
+
+
+def test_pypi_stream_releases(tmp_path, monkeypatch):
+    """test that metadata is complete by default, and streaming is opt-in"""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import pytest
+
+    pytest.importorskip("ijson")
+    from caliper.managers import PypiManager
+
+    metadata = {
+        "info": {"name": "sif"},
+        "releases": {"0.0.1": [{"python_version": "source"}]},
+    }
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                statuses.append(304)
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = json.dumps(metadata).encode("utf-8")
+            statuses.append(200)
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setenv("CALIPER_CACHE", str(tmp_path))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        PypiManager, "baseurl", "http://127.0.0.1:%s/pypi" % server.server_port
+    )
+    try:
+        manager = PypiManager("pypi:sif")
+        manager.do_metadata_request()
+        assert manager.metadata == metadata
+
+        # Streaming only keeps the releases, and is revalidated from the cache
+        manager.stream_releases = True
+        for _ in range(2):
+            manager.do_metadata_request()
+            assert manager.metadata == {"releases": metadata["releases"]}
+        assert statuses == [200, 200, 304]
+    finally:
+        server.shutdown()
+        server.server_close()
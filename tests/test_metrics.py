@@ -2,6 +2,39 @@ __author__ = "Vanessa Sochat"
 __copyright__ = "Copyright 2020-2024, Vanessa Sochat"
 __license__ = "MPL 2.0"
 
+import os
+import threading
+import zipfile
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def metric_server(tmp_path, monkeypatch):
+    """Serve a metric folder with an index.json, like a metrics repository"""
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    metric_dir = os.path.join(str(tmp_path), "metric")
+    os.mkdir(metric_dir)
+    with zipfile.ZipFile(os.path.join(metric_dir, "metric-results.zip"), "w") as zf:
+        zf.writestr("metric-results.json", '{"0.0.1": {"lines": 1}}')
+    with open(os.path.join(metric_dir, "index.json"), "w") as fd:
+        fd.write('{"data": {"zip": {"url": "metric-results.zip"}}}')
+
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    handler = partial(Handler, directory=str(tmp_path))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%s/metric/index.json" % server.server_port
+    server.shutdown()
+    server.server_close()
+
 
 def test_metrics_loading(tmp_path):
     """test that an existing metric can be loaded"""
@@ -42,3 +75,134 @@ def test_metrics_extractor(tmp_path):
         elif isinstance(metric, MetricBase):
             # One is required
             assert results.get("0.0.1")
+
+
+def test_prepare_repository_failed_download(tmp_path, monkeypatch):
+    """test that a failed download doesn't leave staged downloads behind"""
+    import tempfile
+
+    from caliper.managers.base import ManagerBase
+    from caliper.metrics import MetricsExtractor
+
+    class FailingManager(ManagerBase):
+        name = "failing"
+
+        def get_package_metadata(self):
+            return [{"version": "0.0.%s" % i} for i in range(3)]
+
+        def download(self, spec, dest):
+            raise RuntimeError("Cannot download %s" % spec["version"])
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    extractor = MetricsExtractor(FailingManager("failing:package"), quiet=True)
+    with pytest.raises(RuntimeError):
+        extractor.prepare_repository(jobs=2)
+    assert [x for x in os.listdir(str(tmp_path)) if "-downloads-" in x] == []
+
+
+def test_prepare_repository_deleted_files(tmp_path, monkeypatch):
+    """test that a file deleted in a package folder is gone from the next version"""
+    import subprocess
+    import tempfile
+
+    from caliper.managers.base import ManagerBase
+    from caliper.metrics import MetricsExtractor
+
+    files = {
+        "0.0.1": ["pkg/a.py", "pkg/b.py", "pkg-0.0.1.dist-info/METADATA"],
+        "0.0.2": ["pkg/a.py", "pkg-0.0.2.dist-info/METADATA"],
+    }
+
+    class WheelManager(ManagerBase):
+        name = "wheel"
+
+        def get_package_metadata(self):
+            return [{"version": version} for version in files]
+
+        def download(self, spec, dest):
+            for path in files[spec["version"]]:
+                os.makedirs(os.path.join(dest, os.path.dirname(path)), exist_ok=True)
+                with open(os.path.join(dest, path), "w") as fd:
+                    fd.write(spec["version"])
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    extractor = MetricsExtractor(WheelManager("wheel:package"), quiet=True)
+    git = extractor.prepare_repository(jobs=2)
+
+    def committed(tag):
+        return subprocess.check_output(
+            ["git", "-C", git.folder, "ls-tree", "-r", "--name-only", tag], text=True
+        ).split()
+
+    assert committed("0.0.1") == sorted(files["0.0.1"])
+
+    # Top level folders are replaced, other top level entries are kept
+    assert committed("0.0.2") == [
+        "pkg-0.0.1.dist-info/METADATA",
+        "pkg-0.0.2.dist-info/METADATA",
+        "pkg/a.py",
+    ]
+
+
+def test_extract_jobs_argument():
+    """test that extract --jobs must be a positive integer"""
+    from caliper.client import get_parser
+
+    parser = get_parser("extract")
+    assert parser.parse_args(["extract", "--jobs", "3"]).jobs == 3
+    for jobs in ["0", "-1", "many"]:
+        with pytest.raises(SystemExit):
+            parser.parse_args(["extract", "--jobs", jobs])
+
+
+def test_read_metric_repo_zip(metric_server):
+    """test that a zipped metric is downloaded from the url in the index"""
+    from caliper.metrics import MetricsExtractor
+
+    extractor = MetricsExtractor("pypi:sif")
+    data = {"zip": {"url": "metric-results.zip"}}
+    result = extractor._read_metric_repo(metric_server, {}, data, "metric", "zip")
+    assert result == {"0.0.1": {"lines": 1}}
+
+
+def test_load_metric_file(tmp_path):
+    """test that a metric is loaded from a json or zip filename"""
+    from caliper.metrics import MetricsExtractor
+
+    json_file = os.path.join(str(tmp_path), "results.json")
+    with open(json_file, "w") as fd:
+        fd.write('{"0.0.1": {"lines": 1}}')
+    zip_file = os.path.join(str(tmp_path), "results.zip")
+    with zipfile.ZipFile(zip_file, "w") as zf:
+        zf.writestr("metric-results.json", '{"0.0.2": {"lines": 2}}')
+
+    extractor = MetricsExtractor("pypi:sif")
+    assert extractor._load_metric_file(json_file, "metric") == {"0.0.1": {"lines": 1}}
+    assert extractor._load_metric_file(zip_file, "metric") == {"0.0.2": {"lines": 2}}
+
+
+def test_load_metric_cache(monkeypatch):
+    """test that repository loads are cached by manager uri, failures are not"""
+    from caliper.managers import PypiManager
+    from caliper.metrics import MetricsExtractor
+
+    results = [None, {"0.0.1": {"lines": 1}}]
+    calls = []
+
+    def load_metric_repo(self, metric, *args):
+        calls.append(metric)
+        return results.pop(0)
+
+    monkeypatch.setattr(MetricsExtractor, "_load_metric_repo", load_metric_repo)
+    MetricsExtractor.clear_cache()
+
+    # A failed load is tried again
+    assert MetricsExtractor("pypi:sif").load_metric("metric") is None
+    assert MetricsExtractor("pypi:sif").load_metric("metric") == {"0.0.1": {"lines": 1}}
+
+    # An equal manager (string or object) shares the cached result
+    assert MetricsExtractor(PypiManager("pypi:sif")).load_metric("metric") == {
+        "0.0.1": {"lines": 1}
+    }
+    assert calls == ["metric", "metric"]
+    MetricsExtractor.clear_cache()
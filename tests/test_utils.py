@@ -0,0 +1,103 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2020-2024, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def etag_server(monkeypatch):
+    """A local server that answers with an ETag, and 304 when it matches"""
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                statuses.append(304)
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b'{"name": "sif"}'
+            statuses.append(200)
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%s/pypi/sif/json" % server.server_port, statuses
+    server.shutdown()
+    server.server_close()
+
+
+def test_write_json_format(tmp_path, monkeypatch):
+    """test that json is written the same with or without orjson"""
+    import caliper.utils.file as utils
+
+    data = {"versions": ["0.0.1", {"sha": None, "lines": 2.5}], "name": "sïf"}
+    for pretty in [True, False]:
+        written = []
+        for use_orjson in [True, False]:
+            if not use_orjson:
+                monkeypatch.setattr(utils, "orjson", None)
+            filename = os.path.join(str(tmp_path), "%s-%s.json" % (pretty, use_orjson))
+            utils.write_json(data, filename, pretty=pretty)
+            with open(filename, "rb") as fd:
+                written.append(fd.read())
+            assert utils.read_json(filename) == data
+            monkeypatch.undo()
+
+        # Pretty printed json has an indent of 2
+        assert written[0] == written[1]
+        assert written[0].startswith(b'{\n  "versions"') == pretty
+
+
+def test_do_request_revalidates_cache(tmp_path, monkeypatch, etag_server):
+    """test that a cached response is revalidated, and reused on a 304"""
+    from caliper.utils.command import do_request
+
+    url, statuses = etag_server
+    monkeypatch.setenv("CALIPER_CACHE", str(tmp_path))
+    assert do_request(url, cache=True) == {"name": "sif"}
+    assert do_request(url, cache=True) == {"name": "sif"}
+    assert statuses == [200, 304]
+
+
+def test_do_request_unwritable_cache(tmp_path, monkeypatch, etag_server):
+    """test that a cache directory that can't be written is skipped"""
+    from caliper.utils.command import do_request
+
+    url, statuses = etag_server
+    cache_dir = os.path.join(str(tmp_path), "not-a-directory")
+    with open(cache_dir, "w") as fd:
+        fd.write("")
+    monkeypatch.setenv("CALIPER_CACHE", cache_dir)
+    assert do_request(url, cache=True) == {"name": "sif"}
+    assert do_request(url, cache=True) == {"name": "sif"}
+    assert statuses == [200, 200]
+
+
+def test_read_json_nan(tmp_path):
+    """test that json with NaN or Infinity (written by json.dump) is read"""
+    import math
+
+    from caliper.utils.file import read_json
+
+    filename = os.path.join(str(tmp_path), "results.json")
+    with open(filename, "w") as fd:
+        fd.write('{"0.0.1": {"ratio": NaN, "max": Infinity}}')
+    data = read_json(filename)
+    assert math.isnan(data["0.0.1"]["ratio"])
+    assert data["0.0.1"]["max"] == math.inf
@@ -0,0 +1,76 @@
+__author__ = "Vanessa Sochat"
+__copyright__ = "Copyright 2020-2024, Vanessa Sochat"
+__license__ = "MPL 2.0"
+
+
+def test_workers_batches():
+    """test that worker tasks are split into ordered batches"""
+    from caliper.analysis.workers import Workers
+
+    workers = Workers(2, batch_size=3)
+    for i in range(7):
+        workers.add_task("task-%s" % i, func=dict, params={"index": i})
+
+    batches = workers.batches()
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    keys = [key for batch in batches for key, _, _ in batch]
+    assert keys == ["task-%s" % i for i in range(7)]
+    assert batches[0][1] == ("task-1", dict, {"index": 1})
+
+    # Without a batch size, a few tasks are each their own batch
+    workers.batch_size = None
+    assert [len(batch) for batch in workers.batches()] == [1] * 7
+
+
+def test_workers_run():
+    """test running tasks, with the pool sized by the task count"""
+    from caliper.analysis.workers import Workers
+
+    workers = Workers(4, show_progress=False)
+    for i in range(3):
+        workers.add_task("task-%s" % i, func=dict, params={"index": i})
+    assert workers.run() == {"task-%s" % i: {"index": i} for i in range(3)}
+
+
+def test_workers_run_main():
+    """test running a function defined in __main__, e.g., a script or notebook"""
+    import subprocess
+    import sys
+
+    script = (
+        "from caliper.analysis.workers import Workers\n"
+        "def square(number):\n"
+        "    return number * number\n"
+        "if __name__ == '__main__':\n"
+        "    workers = Workers(2, show_progress=False)\n"
+        "    for i in range(3):\n"
+        "        workers.add_task(str(i), func=square, params={'number': i})\n"
+        "    print(sorted(workers.run().items()))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-"], input=script, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[('0', 0), ('1', 1), ('2', 4)]"
+
+
+def test_terminate():
+    """test that terminate stops a running task instead of waiting for it"""
+    import multiprocessing
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    from caliper.analysis.workers import terminate
+
+    executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork"))
+    future = executor.submit(time.sleep, 60)
+    while not future.running():
+        time.sleep(0.05)
+    processes = list(executor._processes.values())
+
+    start = time.time()
+    terminate(executor)
+    for process in processes:
+        process.join(10)
+        assert not process.is_alive()
+    assert time.time() - start < 10